@@ -1,12 +1,79 @@
+import asyncio
+from typing import Optional
 from core.claude import Claude
+from core.scheduler import RequestScheduler
+from core.session_store import SessionStore
 from mcp_client import MCPClient
 from core.tools import ToolManager
 
+# Sent as the system instruction when a turn runs out of budget
+FORCE_ANSWER_INSTRUCTION = (
+    "You can no longer call tools for this question ({reason}). "
+    "Answer the user's question now using only the information gathered so far. "
+    "If it is incomplete, say what is missing."
+)
+
+
+class _StageTimeout(Exception):
+    """A step of a turn ran past its time budget."""
+
+
 class Chat:
-    def __init__(self, claude_service: Claude, clients: dict[str, MCPClient]):
+    def __init__(
+        self,
+        claude_service: Claude,
+        clients: dict[str, MCPClient],
+        scheduler: Optional[RequestScheduler] = None,
+        session_id: str = "default",
+        max_tool_rounds: int = 10,
+        turn_deadline: Optional[float] = 120.0,
+        tool_timeout: Optional[float] = 30.0,
+        final_answer_timeout: Optional[float] = 60.0,
+        session_store: Optional[SessionStore] = None,
+    ):
         self.claude_service: Claude = claude_service
         self.clients: dict[str, MCPClient] = clients
+        self.scheduler: Optional[RequestScheduler] = scheduler
+        self.session_id: str = session_id
         self.messages: list = []
+        # Kind of request being answered ("chat" or a prompt command name)
+        self.task: str = "chat"
+
+        # Per-turn limits for the tool-calling loop
+        self.max_tool_rounds = max_tool_rounds
+        self.turn_deadline = turn_deadline
+        self.tool_timeout = tool_timeout
+        self.final_answer_timeout = final_answer_timeout
+
+        # The running step of the current turn, so cancel() can stop it
+        self._stage: Optional[asyncio.Task] = None
+        self._in_turn = False
+        self._cancel_requested = False
+
+        # Messages before this index are already in the session log
+        self.session_store: Optional[SessionStore] = session_store
+        self._persisted = 0
+
+    def resume(self, token_budget: Optional[int] = None) -> int:
+        """
+        Loads the most recent messages of this session that fit in
+        `token_budget`. Returns the number of messages restored.
+        """
+        if self.session_store is None:
+            return 0
+        self.messages = self.session_store.load_tail(self.session_id, token_budget)
+        self._persisted = len(self.messages)
+        # A crash between a tool call and its result leaves the call unanswered
+        self._close_pending_tool_calls("session interrupted")
+        self._persist()
+        return len(self.messages)
+
+    def _persist(self):
+        """Appends messages added since the last call to the session log."""
+        if self.session_store is None:
+            return
+        self.session_store.append(self.session_id, self.messages[self._persisted :])
+        self._persisted = len(self.messages)
 
     async def _process_query(self, query: str):
         self.claude_service.add_user_message(self.messages, query)
@@ -18,38 +85,180 @@ class Chat:
         except:
             return False
 
-    async def run(self, query: str) -> str:
-        final_text_response = ""
-        await self._process_query(query)
+    async def _chat(self, **kwargs):
+        """Sends a request to Gemini, through the rate limiter if configured."""
+        kwargs.setdefault("task", self.task)
+        if self.scheduler is None:
+            # Run in a thread so deadlines and cancellation can interrupt the
+            # wait; a cancelled request is abandoned and finishes in the background
+            return await asyncio.to_thread(self.claude_service.chat, **kwargs)
+        return await self.scheduler.chat(
+            self.claude_service, session_id=self.session_id, **kwargs
+        )
+
+    def cancel(self):
+        """Stops the running turn; the model is asked to answer with what it has."""
+        if not self._in_turn:
+            return
+        self._cancel_requested = True
+        if self._stage is not None and not self._stage.done():
+            self._stage.cancel()
+
+    async def _run_stage(self, coro, timeout: Optional[float] = None):
+        """
+        Runs one step of a turn as a task that cancel() can stop. Raises
+        CancelledError if the turn was cancelled and _StageTimeout if the
+        step ran past `timeout`.
+        """
+        if self._cancel_requested:
+            # Cancelled between steps, before this one started
+            coro.close()
+            raise asyncio.CancelledError
+        self._stage = stage = asyncio.create_task(coro)
+        try:
+            return await asyncio.wait_for(stage, timeout=timeout)
+        except asyncio.TimeoutError:
+            # A TimeoutError raised by the step itself (e.g. after exhausted
+            # retries) is a real failure, not an expired budget
+            if not stage.cancelled():
+                raise
+            raise _StageTimeout
+        finally:
+            self._stage = None
 
+    async def _tool_loop(self) -> Optional[str]:
+        """
+        Runs model/tool rounds until the model answers with text.
+        Returns None if the tool round limit is reached first.
+        """
+        rounds = 0
         while True:
             # 1. Get response from Gemini
             tools = await ToolManager.get_all_tools(self.clients)
-            response = self.claude_service.chat(
+            response = await self._chat(
                 messages=self.messages,
                 tools=tools,
             )
 
             # 2. Add the assistant's response to history
             self.claude_service.add_assistant_message(self.messages, response)
+            self._persist()
 
             # 3. Check for tool usage
-            if self._is_tool_call(response):
-                print(" > Executing tool...")
-                
-                # Execute tools and get the response parts
-                tool_outputs = await ToolManager.execute_tool_requests(
-                    self.clients, response
-                )
+            if not self._is_tool_call(response):
+                # No tool calls, we are done
+                return self.claude_service.text_from_message(response)
+
+            print(" > Executing tool...")
+
+            # Execute tools and get the response parts
+            tool_outputs = await ToolManager.execute_tool_requests(
+                self.clients, response, timeout=self.tool_timeout
+            )
+
+            # Add the tool outputs to history
+            self.claude_service.add_tool_output_messages(
+                self.messages, tool_outputs
+            )
+            self._persist()
 
-                # Add the tool outputs to history
-                self.claude_service.add_tool_output_messages(
-                    self.messages, tool_outputs
+            rounds += 1
+            if self.max_tool_rounds is not None and rounds >= self.max_tool_rounds:
+                return None
+            # Loop continues to send tool outputs back to the model
+
+    def _close_pending_tool_calls(self, reason: str):
+        """
+        Answers function calls left without a response by an interrupted
+        round, so the history stays valid for the next request.
+        """
+        if not self.messages or self.messages[-1].get("role") != "model":
+            return
+        calls = [
+            part["function_call"]
+            for part in self.messages[-1].get("parts", [])
+            if isinstance(part, dict) and "function_call" in part
+        ]
+        if calls:
+            self.claude_service.add_tool_output_messages(
+                self.messages,
+                [
+                    {
+                        "function_response": {
+                            "name": call["name"],
+                            "response": {"error": f"Not executed: {reason}"},
+                        }
+                    }
+                    for call in calls
+                ],
+            )
+
+    async def _final_answer(self, reason: str):
+        tools = await ToolManager.get_all_tools(self.clients)
+        return await self._chat(
+            messages=self.messages,
+            system=FORCE_ANSWER_INSTRUCTION.format(reason=reason),
+            tools=tools,
+            tool_config={"function_calling_config": {"mode": "NONE"}},
+        )
+
+    async def _force_answer(self, reason: str) -> str:
+        print(f" > Stopping tool use: {reason}")
+        self._close_pending_tool_calls(reason)
+
+        try:
+            response = await self._run_stage(
+                self._final_answer(reason), timeout=self.final_answer_timeout
+            )
+        except _StageTimeout:
+            self._persist()
+            return f"[No answer: {reason}, and the final answer timed out]"
+        except asyncio.CancelledError:
+            if not self._cancel_requested:
+                raise
+            self._persist()
+            return f"[No answer: {reason}, and the final answer was cancelled]"
+
+        self.claude_service.add_assistant_message(self.messages, response)
+        self._persist()
+        return self.claude_service.text_from_message(response)
+
+    async def run(self, query: str) -> str:
+        """
+        Answers `query`, running tools as requested by the model.
+
+        The tool loop is bounded by `turn_deadline`; once it stops, the final
+        answer may take up to `final_answer_timeout` more, so a turn lasts at
+        most turn_deadline + final_answer_timeout seconds.
+        """
+        self.task = "chat"
+        self._cancel_requested = False
+        self._in_turn = True
+        try:
+            try:
+                await self._run_stage(self._process_query(query))
+            except asyncio.CancelledError:
+                if not self._cancel_requested:
+                    raise
+                return "[Cancelled]"
+            self._persist()
+
+            try:
+                final_text_response = await self._run_stage(
+                    self._tool_loop(), timeout=self.turn_deadline
                 )
-                # Loop continues to send tool outputs back to the model
-            else:
-                # No tool calls, we are done
-                final_text_response = self.claude_service.text_from_message(response)
-                break
+                if final_text_response is not None:
+                    return final_text_response
+                reason = f"reached the limit of {self.max_tool_rounds} tool rounds"
+            except _StageTimeout:
+                reason = f"exceeded the {self.turn_deadline:g}s turn deadline"
+            except asyncio.CancelledError:
+                if not self._cancel_requested:
+                    raise
+                # A further Ctrl+C stops the final answer as well
+                self._cancel_requested = False
+                reason = "cancelled by the user"
 
-        return final_text_response
\ No newline at end of file
+            return await self._force_answer(reason)
+        finally:
+            self._in_turn = False
@@ -32,7 +32,10 @@ class Claude:
                         clean_parts.append({
                             "function_call": {
                                 "name": part.function_call.name,
-                                "args": dict(part.function_call.args)
+                                # to_dict converts nested proto maps/lists too
+                                "args": type(part.function_call).to_dict(
+                                    part.function_call
+                                ).get("args", {}),
                             }
                         })
                 
@@ -56,12 +59,21 @@ class Claude:
         except ValueError:
             return ""
 
-    def chat(self, messages: list, system: str = None, tools: list = None):
+    def chat(
+        self,
+        messages: list,
+        system: str = None,
+        tools: list = None,
+        tool_config: dict = None,
+        task: str = None,
+    ):
+        # `task` is a routing hint for ModelRouter; a single model ignores it
         current_model = self.model
         if tools:
             current_model = genai.GenerativeModel(
                 self.model.model_name, 
                 tools=[tools], 
+                tool_config=tool_config,
                 system_instruction=system
             )
         elif system:
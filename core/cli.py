@@ -1,9 +1,11 @@
+import asyncio
+import signal
 from typing import List, Optional
 from prompt_toolkit import PromptSession
 from prompt_toolkit.completion import Completer, Completion
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.styles import Style
-from prompt_toolkit.history import InMemoryHistory
+from prompt_toolkit.history import FileHistory, InMemoryHistory
 from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
 from prompt_toolkit.document import Document
 from prompt_toolkit.buffer import Buffer
@@ -98,22 +100,21 @@ class UnifiedCompleter(Completer):
             if len(parts) >= 2:
                 doc_prefix = parts[-1]
 
-                for resource in self.resources:
-                    if "id" in resource and resource["id"].lower().startswith(
-                        doc_prefix.lower()
-                    ):
+                for resource_id in self.resources:
+                    if resource_id.lower().startswith(doc_prefix.lower()):
                         yield Completion(
-                            resource["id"],
+                            resource_id,
                             start_position=-len(doc_prefix),
-                            display=resource["id"],
+                            display=resource_id,
                         )
                 return
 
 
 class CliApp:
-    def __init__(self, agent: CliChat):
+    def __init__(self, agent: CliChat, history_path: Optional[str] = None):
         self.agent = agent
         self.resources = []
+        self.resource_ids: set[str] = set()
         self.prompts = []
 
         self.completer = UnifiedCompleter()
@@ -159,7 +160,9 @@ class CliApp:
                     ):
                         buffer.start_completion(select_first=False)
 
-        self.history = InMemoryHistory()
+        self.history = (
+            FileHistory(history_path) if history_path else InMemoryHistory()
+        )
         self.session = PromptSession(
             completer=self.completer,
             history=self.history,
@@ -175,6 +178,25 @@ class CliApp:
             complete_in_thread=True,
             auto_suggest=self.command_autosuggester,
         )
+        self.session.default_buffer.on_text_changed += self._on_text_changed
+
+    def _completed_mentions(self, text: str) -> set[str]:
+        """
+        Returns @mentions the user has finished typing: those followed by
+        whitespace, or a trailing one that exactly matches a known resource.
+        Once the document list is known, only real document ids count.
+        """
+        words = text.split()
+        if words and not text[-1].isspace() and words[-1][1:] not in self.resource_ids:
+            words = words[:-1]
+        mentions = {word[1:] for word in words if word.startswith("@") and len(word) > 1}
+        if self.resource_ids:
+            mentions &= self.resource_ids
+        return mentions
+
+    def _on_text_changed(self, buffer: Buffer):
+        # Fetch mentioned documents while the user is still typing
+        self.agent.prefetch_docs(self._completed_mentions(buffer.text))
 
     async def initialize(self):
         await self.refresh_resources()
@@ -183,6 +205,7 @@ class CliApp:
     async def refresh_resources(self):
         try:
             self.resources = await self.agent.list_docs_ids()
+            self.resource_ids = set(self.resources)
             self.completer.update_resources(self.resources)
         except Exception as e:
             print(f"Error refreshing resources: {e}")
@@ -196,6 +219,37 @@ class CliApp:
         except Exception as e:
             print(f"Error refreshing prompts: {e}")
 
+    async def _run_turn(self, user_input: str) -> str:
+        scheduler = self.agent.scheduler
+        before = scheduler.stats() if scheduler else None
+        try:
+            return await self._run_agent(user_input)
+        finally:
+            if scheduler:
+                summary = scheduler.summarize_since(before)
+                if summary:
+                    print(f" > {summary}")
+
+    async def _run_agent(self, user_input: str) -> str:
+        # Ctrl+C while the agent is working cancels the turn, not the app
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.agent.cancel)
+            restore = lambda: loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops have no add_signal_handler; use a plain
+            # signal handler that hands the cancel over to the loop
+            previous = signal.signal(
+                signal.SIGINT,
+                lambda *_: loop.call_soon_threadsafe(self.agent.cancel),
+            )
+            restore = lambda: signal.signal(signal.SIGINT, previous)
+
+        try:
+            return await self.agent.run(user_input)
+        finally:
+            restore()
+
     async def run(self):
         while True:
             try:
@@ -203,7 +257,7 @@ class CliApp:
                 if not user_input.strip():
                     continue
 
-                response = await self.agent.run(user_input)
+                response = await self._run_turn(user_input)
                 print(f"\nResponse:\n{response}")
 
             except KeyboardInterrupt:
@@ -1,8 +1,12 @@
-from typing import List, Tuple
+import asyncio
+import json
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from mcp.types import Prompt, PromptMessage
 
 from core.chat import Chat
 from core.claude import Claude
+from core.scheduler import RequestScheduler
 from mcp_client import MCPClient
 
 
@@ -12,15 +16,29 @@ class CliChat(Chat):
         doc_client: MCPClient,
         clients: dict[str, MCPClient],
         claude_service: Claude,
+        scheduler: Optional[RequestScheduler] = None,
+        max_prefetched_docs: int = 16,
+        **kwargs,
     ):
-        super().__init__(clients=clients, claude_service=claude_service)
+        super().__init__(
+            clients=clients,
+            claude_service=claude_service,
+            scheduler=scheduler,
+            **kwargs,
+        )
         self.doc_client: MCPClient = doc_client
+        # Documents fetched in the background while the user is typing
+        self.max_prefetched_docs = max_prefetched_docs
+        self._doc_cache: OrderedDict[str, str] = OrderedDict()
+        self._prefetch_tasks: dict[str, asyncio.Task] = {}
 
     async def list_prompts(self) -> list[Prompt]:
         return await self.doc_client.list_prompts()
 
     async def list_docs_ids(self) -> list[str]:
-        return await self.doc_client.read_resource("docs://documents")
+        # The server returns the list of filenames as JSON text
+        content = await self.doc_client.read_resource("docs://documents")
+        return json.loads(content) if content else []
 
     async def get_doc_content(self, doc_id: str) -> str:
         return await self.doc_client.read_resource(f"docs://documents/{doc_id}")
@@ -30,20 +48,70 @@ class CliChat(Chat):
     ) -> list[PromptMessage]:
         return await self.doc_client.get_prompt(command, {"doc_id": doc_id})
 
-    async def _extract_resources(self, query: str) -> str:
-        mentions = [word[1:] for word in query.split() if word.startswith("@")]
-
-        doc_ids = await self.list_docs_ids()
-        mentioned_docs: list[Tuple[str, str]] = []
-
-        for doc_id in mentions:
-            try:
-                content = await self.get_doc_content(doc_id)
-                mentioned_docs.append((doc_id, content))
-            except Exception:
-         
-                print(f"Warning: Could not find document '@{doc_id}'")
+    def prefetch_docs(self, doc_ids: set[str]):
+        """
+        Starts background fetches for the given mentioned documents and
+        cancels fetches (and drops fetched content) for mentions that are
+        no longer in the input.
+        """
+        for doc_id, task in list(self._prefetch_tasks.items()):
+            if doc_id not in doc_ids:
+                task.cancel()
+                del self._prefetch_tasks[doc_id]
+        for doc_id in list(self._doc_cache):
+            if doc_id not in doc_ids:
+                del self._doc_cache[doc_id]
+
+        for doc_id in doc_ids:
+            if doc_id in self._doc_cache or doc_id in self._prefetch_tasks:
                 continue
+            self._prefetch_tasks[doc_id] = asyncio.create_task(
+                self._prefetch_doc(doc_id)
+            )
+
+    async def _prefetch_doc(self, doc_id: str):
+        try:
+            content = await self.get_doc_content(doc_id)
+        except Exception:
+            # Errors are reported when the query is actually submitted
+            return
+        finally:
+            if self._prefetch_tasks.get(doc_id) is asyncio.current_task():
+                del self._prefetch_tasks[doc_id]
+
+        self._doc_cache[doc_id] = content
+        self._doc_cache.move_to_end(doc_id)
+        while len(self._doc_cache) > self.max_prefetched_docs:
+            self._doc_cache.popitem(last=False)
+
+    async def _get_mentioned_doc(self, doc_id: str) -> Optional[str]:
+        task = self._prefetch_tasks.get(doc_id)
+        if task is not None:
+            await asyncio.wait([task])
+
+        if doc_id in self._doc_cache:
+            return self._doc_cache[doc_id]
+
+        try:
+            return await self.get_doc_content(doc_id)
+        except Exception:
+            print(f"Warning: Could not find document '@{doc_id}'")
+            return None
+
+    async def _extract_resources(self, query: str) -> str:
+        mentions = list(
+            dict.fromkeys(word[1:] for word in query.split() if word.startswith("@"))
+        )
+
+        # Prefetched documents are already local; the rest are fetched concurrently
+        contents = await asyncio.gather(
+            *(self._get_mentioned_doc(doc_id) for doc_id in mentions)
+        )
+        mentioned_docs: list[Tuple[str, str]] = [
+            (doc_id, content)
+            for doc_id, content in zip(mentions, contents)
+            if content is not None
+        ]
 
         return "".join(
             f'\n<document id="{doc_id}">\n{content}\n</document>\n'
@@ -64,16 +132,27 @@ class CliChat(Chat):
                 command, {"doc_id": doc_arg}
             )
             self.messages += convert_prompt_messages_to_gemini(messages)
+            self.task = command
             return True
         except Exception as e:
             print(f"Error processing command: {e}")
             return False
 
-    async def _process_query(self, query: str):
-        if await self._process_command(query):
-            return
+    def _reset_prefetch(self):
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        self._prefetch_tasks.clear()
+        self._doc_cache.clear()
 
-        added_resources = await self._extract_resources(query)
+    async def _process_query(self, query: str):
+        try:
+            if await self._process_command(query):
+                return
+            added_resources = await self._extract_resources(query)
+        finally:
+            # Prefetched content only serves this query; documents may be
+            # edited during the turn, so nothing is carried into the next one
+            self._reset_prefetch()
 
         prompt = f"""
         The user has a question:
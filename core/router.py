@@ -0,0 +1,174 @@
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from core.claude import Claude
+from core.scheduler import RETRYABLE_ERRORS, estimate_tokens
+
+# Commands that need the strongest model regardless of prompt size
+HEAVY_TASKS = {"rewrite"}
+# Commands that should skip the fastest model
+MEDIUM_TASKS = {"summarize"}
+
+
+class ModelStats:
+    """
+    Rolling latency and error rate over the last `window` requests.
+    Samples older than `max_age` seconds are forgotten, so a model that was
+    pushed back by failures is eventually tried first again.
+    """
+
+    def __init__(self, window: int = 20, max_age: float = 300.0):
+        self.samples: deque = deque(maxlen=window)
+        self.max_age = max_age
+
+    def record(self, latency: float, ok: bool):
+        self.samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self) -> list:
+        cutoff = time.monotonic() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return list(self.samples)
+
+    @property
+    def latency(self) -> Optional[float]:
+        latencies = [latency for _, latency, ok in self._recent() if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        samples = self._recent()
+        if not samples:
+            return 0.0
+        return sum(1 for _, _, ok in samples if not ok) / len(samples)
+
+
+class ModelRouter(Claude):
+    """
+    Drop-in replacement for `Claude` that picks a model per request.
+
+    `models` is ordered from fastest to strongest. Each request is given a
+    minimum tier from its prompt size, whether tools are attached and the
+    command that produced it; eligible models are then ranked by observed
+    latency and error rate, falling back to the next one on a retryable
+    failure. Under a RequestScheduler each fallback is admitted separately.
+    """
+
+    def __init__(
+        self,
+        models: list[str],
+        large_prompt_tokens: int = 8_000,
+        medium_prompt_tokens: int = 2_000,
+        window: int = 20,
+        stats_max_age: float = 300.0,
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        super().__init__(model=models[0])
+        self.services = {name: Claude(model=name) for name in models}
+        self.models = list(models)
+        self.stats = {name: ModelStats(window, stats_max_age) for name in models}
+        self.large_prompt_tokens = large_prompt_tokens
+        self.medium_prompt_tokens = medium_prompt_tokens
+
+    def _min_tier(self, tokens: int, needs_tools: bool, task: Optional[str]) -> int:
+        """
+        Maps request difficulty (0 light, 1 medium, 2 heavy) onto a model index,
+        rounding up: with 2 models medium and heavy both skip the fast one, with
+        3 models each level gets its own tier.
+        """
+        if task in HEAVY_TASKS or tokens >= self.large_prompt_tokens:
+            level = 2
+        elif task in MEDIUM_TASKS or needs_tools or tokens >= self.medium_prompt_tokens:
+            level = 1
+        else:
+            level = 0
+        return math.ceil(level * (len(self.models) - 1) / 2)
+
+    def _score(self, name: str, default_latency: float) -> float:
+        """Expected time to a successful answer from `name`."""
+        stats = self.stats[name]
+        latency = stats.latency if stats.latency is not None else default_latency
+        return latency / max(1.0 - stats.error_rate, 0.05)
+
+    def route(
+        self, tokens: int, needs_tools: bool = False, task: Optional[str] = None
+    ) -> list[str]:
+        """Returns the models to try for a request, in order."""
+        eligible = self.models[self._min_tier(tokens, needs_tools, task) :]
+        # Models without successful samples are assumed as fast as the best one
+        known = [
+            self.stats[name].latency
+            for name in eligible
+            if self.stats[name].latency is not None
+        ]
+        default_latency = min(known) if known else 1.0
+        # sorted() is stable, so equally scored models keep the fast-first order
+        return sorted(eligible, key=lambda name: self._score(name, default_latency))
+
+    def plan(
+        self,
+        messages: list,
+        system: str = None,
+        tools: list = None,
+        task: str = None,
+        **kwargs,
+    ) -> list[str]:
+        """Picks the models to try for a request, in order, and logs the choice."""
+        tokens = estimate_tokens(messages, system)
+        # Tools are offered on every request; they are only really needed
+        # once the model is in the middle of a tool chain
+        needs_tools = bool(tools) and bool(messages) and (
+            messages[-1].get("role") == "function"
+        )
+        candidates = self.route(tokens, needs_tools, task)
+        print(
+            f" > Routing {task or 'chat'} (~{tokens} tokens"
+            f"{', tool chain' if needs_tools else ''}) to {candidates[0]}"
+        )
+        return candidates
+
+    def chat_with(
+        self,
+        name: str,
+        messages: list,
+        system: str = None,
+        tools: list = None,
+        tool_config: dict = None,
+        task: str = None,
+    ):
+        """
+        Sends the request to model `name`. Only retryable errors count
+        against the model; anything else is the request's fault.
+        """
+        started = time.monotonic()
+        try:
+            response = self.services[name].chat(
+                messages, system=system, tools=tools, tool_config=tool_config
+            )
+        except RETRYABLE_ERRORS as e:
+            self.stats[name].record(time.monotonic() - started, ok=False)
+            print(f" > Model {name} failed ({type(e).__name__}): {e}")
+            raise
+        self.stats[name].record(time.monotonic() - started, ok=True)
+        return response
+
+    def chat(
+        self,
+        messages: list,
+        system: str = None,
+        tools: list = None,
+        tool_config: dict = None,
+        task: str = None,
+    ):
+        last_error = None
+        for name in self.plan(messages, system=system, tools=tools, task=task):
+            try:
+                return self.chat_with(
+                    name, messages, system=system, tools=tools, tool_config=tool_config
+                )
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+        raise last_error
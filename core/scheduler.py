@@ -0,0 +1,270 @@
+import asyncio
+import functools
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+# Errors worth retrying: quota (429) and transient server/network failures.
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class TokenBucket:
+    """Refills continuously up to `per_minute` units every 60 seconds."""
+
+    def __init__(self, per_minute: float):
+        if per_minute <= 0:
+            raise ValueError(f"Rate limit must be positive, got {per_minute}")
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        # A single request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+def estimate_tokens(messages: list, system: Optional[str] = None) -> int:
+    """Rough token estimate (~4 characters per token) of a request."""
+    chars = len(str(messages)) + len(system or "")
+    return max(1, chars // 4)
+
+
+class RequestScheduler:
+    """
+    Client-side rate limiter and retry loop around a blocking call
+    such as `Claude.chat`.
+
+    Requests are admitted against requests-per-minute and tokens-per-minute
+    buckets. Waiting requests are served round-robin across sessions so one
+    busy session cannot starve the others. Retryable errors are retried with
+    exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 15,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # session_id -> queue of (future, estimated tokens)
+        self._queues: dict[str, deque] = {}
+        self._order: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.metrics = {
+            "requests": 0,
+            "admissions": 0,
+            "retries": 0,
+            "fallbacks": 0,
+            "failures": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "backoff_total": 0.0,
+        }
+
+    def stats(self) -> dict:
+        """Snapshot of the scheduler metrics, including average queue wait."""
+        stats = dict(self.metrics)
+        admitted = stats["admissions"]
+        stats["queue_wait_avg"] = (
+            stats["queue_wait_total"] / admitted if admitted else 0.0
+        )
+        stats["queued"] = sum(
+            1
+            for queue in self._queues.values()
+            for future, _ in queue
+            if not future.cancelled()
+        )
+        return stats
+
+    def summarize_since(self, before: dict) -> Optional[str]:
+        """
+        One-line summary of queue waits and retries since the `before`
+        snapshot from stats(), or None if requests were never held back.
+        """
+        after = self.stats()
+        waited = after["queue_wait_total"] - before["queue_wait_total"]
+        retries = after["retries"] - before["retries"]
+        backoff = after["backoff_total"] - before["backoff_total"]
+        if waited < 0.05 and not retries:
+            return None
+        return (
+            f"Rate limiter: {waited:.1f}s queued, {retries} retries "
+            f"({backoff:.1f}s backoff); max queue wait so far "
+            f"{after['queue_wait_max']:.1f}s"
+        )
+
+    def _ensure_dispatcher(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _next_waiter(self):
+        """Returns the queue of the session whose turn it is, round-robin."""
+        while self._order:
+            session_id = self._order[0]
+            queue = self._queues.get(session_id)
+            while queue and queue[0][0].cancelled():
+                queue.popleft()
+            if queue:
+                return queue
+            self._order.popleft()
+            self._queues.pop(session_id, None)
+        return None
+
+    async def _dispatch(self):
+        while True:
+            queue = self._next_waiter()
+            if queue is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            future, tokens = queue[0]
+            delay = max(
+                self.request_bucket.time_until(1),
+                self.token_bucket.time_until(tokens),
+            )
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            queue.popleft()
+            # Rotate the session to the back so others get the next slot
+            self._order.rotate(-1)
+            if future.cancelled():
+                continue
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+            future.set_result(None)
+
+    async def _admit(self, session_id: str, tokens: int):
+        """Waits until this session's turn and the buckets allow the request."""
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+
+        if session_id not in self._queues:
+            self._queues[session_id] = deque()
+            self._order.append(session_id)
+        self._queues[session_id].append((future, tokens))
+        self._wakeup.set()
+
+        started = time.monotonic()
+        await future
+        waited = time.monotonic() - started
+        self.metrics["admissions"] += 1
+        self.metrics["queue_wait_total"] += waited
+        self.metrics["queue_wait_max"] = max(self.metrics["queue_wait_max"], waited)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def submit(
+        self,
+        session_id: str,
+        fn: Callable[..., Any],
+        *args,
+        tokens: int = 1,
+        **kwargs,
+    ) -> Any:
+        """
+        Runs the blocking `fn(*args, **kwargs)` in a worker thread once
+        admitted, retrying retryable errors with backoff.
+        """
+        return await self._run_attempts(
+            session_id, [functools.partial(fn, *args, **kwargs)], tokens
+        )
+
+    async def _run_attempts(
+        self, session_id: str, attempts: list[Callable[[], Any]], tokens: int
+    ) -> Any:
+        """
+        Tries each blocking callable in turn, admitting every one separately,
+        and moves to the next on a retryable error. When all of them fail the
+        whole chain is retried with backoff.
+        """
+        self.metrics["requests"] += 1
+        retry = 0
+        while True:
+            for i, attempt_fn in enumerate(attempts):
+                await self._admit(session_id, tokens)
+                try:
+                    return await asyncio.to_thread(attempt_fn)
+                except RETRYABLE_ERRORS as e:
+                    error = e
+                    if i + 1 < len(attempts):
+                        self.metrics["fallbacks"] += 1
+                except Exception:
+                    self.metrics["failures"] += 1
+                    raise
+
+            if retry >= self.max_retries:
+                self.metrics["failures"] += 1
+                raise error
+            delay = self._backoff(retry)
+            retry += 1
+            self.metrics["retries"] += 1
+            self.metrics["backoff_total"] += delay
+            print(
+                f" > Model request failed ({type(error).__name__}), "
+                f"retrying in {delay:.1f}s ({retry}/{self.max_retries})"
+            )
+            await asyncio.sleep(delay)
+
+    async def chat(
+        self, claude_service, session_id: str = "default", **kwargs
+    ) -> Any:
+        """
+        Schedules `claude_service.chat(**kwargs)` under the rate limits.
+        A service that routes between models (see ModelRouter.plan) has each
+        model it falls back to admitted as a separate request.
+        """
+        tokens = estimate_tokens(kwargs.get("messages", []), kwargs.get("system"))
+        plan = getattr(claude_service, "plan", None)
+        if plan is None:
+            attempts = [functools.partial(claude_service.chat, **kwargs)]
+        else:
+            attempts = [
+                functools.partial(claude_service.chat_with, name, **kwargs)
+                for name in plan(**kwargs)
+            ]
+        return await self._run_attempts(session_id, attempts, tokens)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import re
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from core.scheduler import estimate_tokens
+
+# Documents embedded in prompts by CliChat._extract_resources
+DOCUMENT_PATTERN = re.compile(r'(<document id="[^"]*">\n)(.*?)(\n</document>)', re.DOTALL)
+
+
+class SessionStore:
+    """
+    Append-only on-disk log of chat sessions.
+
+    Each session is a JSON-lines file with one message per line. Strings
+    longer than `blob_threshold` (document bodies, tool results) are stored
+    once under `blobs/` by content hash and referenced from the log, so the
+    same document mentioned in many turns is kept on disk a single time.
+    """
+
+    def __init__(self, root: Path, blob_threshold: int = 4096):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_threshold = blob_threshold
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def _log_path(self, session_id: str) -> Path:
+        if not re.fullmatch(r"[\w.-]+", session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return self.root / f"{session_id}.jsonl"
+
+    def exists(self, session_id: str) -> bool:
+        return self._log_path(session_id).exists()
+
+    # --- Writing ---
+
+    def _put_blob(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_dir / f"{digest}.txt"
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _pack_text(self, text: str) -> Any:
+        if len(text) < self.blob_threshold:
+            return text
+        # split() yields [text, open, body, close, text, ...] for each document
+        pieces = DOCUMENT_PATTERN.split(text)
+        if len(pieces) == 1:
+            return {"$blob": self._put_blob(text)}
+        segments = []
+        for i, piece in enumerate(pieces):
+            if i % 4 == 2 and len(piece) >= self.blob_threshold:
+                segments.append({"$blob": self._put_blob(piece)})
+            elif piece:
+                segments.append(piece)
+        return {"$text": segments}
+
+    def _pack(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self._pack_text(value)
+        # Generic Mapping/Sequence so proto containers (MapComposite,
+        # RepeatedComposite) in tool call args become plain JSON types
+        if isinstance(value, Mapping):
+            return {k: self._pack(v) for k, v in value.items()}
+        if isinstance(value, Sequence) and not isinstance(value, (bytes, bytearray)):
+            return [self._pack(v) for v in value]
+        return value
+
+    def append(self, session_id: str, messages: list):
+        """Append messages to the session log."""
+        if not messages:
+            return
+        lines = [
+            json.dumps(
+                {"tokens": estimate_tokens([message]), "message": self._pack(message)},
+                ensure_ascii=False,
+            )
+            for message in messages
+        ]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with self._log_path(session_id).open("a+b") as f:
+            # Terminate a torn last line from an interrupted write, so the
+            # new records don't get glued onto it
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+
+    # --- Reading ---
+
+    def _read_lines_reversed(self, path: Path, block_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield the lines of a file from last to first without reading all of it."""
+        with path.open("rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + remainder).split(b"\n")
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line:
+                        yield line
+            if remainder:
+                yield remainder
+
+    def _unpack(self, value: Any, blobs: dict[str, str]) -> Any:
+        if isinstance(value, dict):
+            if "$blob" in value:
+                digest = value["$blob"]
+                # Share one string per blob across all messages being loaded
+                if digest not in blobs:
+                    blobs[digest] = (self.blob_dir / f"{digest}.txt").read_text(
+                        encoding="utf-8"
+                    )
+                return blobs[digest]
+            if "$text" in value:
+                return "".join(self._unpack(v, blobs) for v in value["$text"])
+            return {k: self._unpack(v, blobs) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._unpack(v, blobs) for v in value]
+        return value
+
+    def load_tail(self, session_id: str, token_budget: Optional[int] = None) -> list:
+        """
+        Load the most recent messages of a session that fit in `token_budget`.
+        The newest user turn is always kept, even if it alone exceeds the budget.
+        Only the log tail is read, and only blobs it references are loaded.
+        """
+        path = self._log_path(session_id)
+        if not path.exists():
+            return []
+
+        records = []
+        used = 0
+        has_user_turn = False
+        for line in self._read_lines_reversed(path):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn line from an interrupted write
+                print(f"Warning: skipping a damaged record in session '{session_id}'")
+                continue
+            over_budget = (
+                token_budget is not None and used + record["tokens"] > token_budget
+            )
+            if over_budget and has_user_turn:
+                break
+            used += record["tokens"]
+            records.append(record["message"])
+            if record["message"].get("role") == "user":
+                has_user_turn = True
+        records.reverse()
+
+        if token_budget is not None and used > token_budget:
+            print(
+                f"Warning: the last turn of session '{session_id}' "
+                f"(~{used} tokens) exceeds the {token_budget} token context budget"
+            )
+
+        # History has to start at a user turn, not mid tool exchange
+        while records and records[0].get("role") != "user":
+            records.pop(0)
+
+        blobs: dict[str, str] = {}
+        return [self._unpack(message, blobs) for message in records]
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Optional, List, Any
 from mcp.types import CallToolResult, TextContent
@@ -49,11 +50,15 @@ class ToolManager:
 
     @classmethod
     async def execute_tool_requests(
-        cls, clients: dict[str, MCPClient], response: Any
+        cls,
+        clients: dict[str, MCPClient],
+        response: Any,
+        timeout: Optional[float] = None,
     ) -> List[dict]:
         """
         Executes function calls from a Gemini response.
         Returns a list of 'function_response' parts.
+        Each tool call is abandoned after `timeout` seconds, if given.
         """
         # Check if the first part is a function call
         if not response.parts:
@@ -84,8 +89,8 @@ class ToolManager:
                 result_content = {"error": "Tool not found"}
             else:
                 try:
-                    tool_output: CallToolResult | None = await client.call_tool(
-                        tool_name, tool_args
+                    tool_output: CallToolResult | None = await asyncio.wait_for(
+                        client.call_tool(tool_name, tool_args), timeout=timeout
                     )
                     
                     # Extract text content
@@ -95,6 +100,8 @@ class ToolManager:
                     
                     result_content = {"result": "\n".join(texts)}
                     
+                except asyncio.TimeoutError:
+                    result_content = {"error": f"Tool timed out after {timeout:g}s"}
                 except Exception as e:
                     result_content = {"error": str(e)}
 
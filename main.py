@@ -1,23 +1,54 @@
 import asyncio
 import sys
 import os
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 from contextlib import AsyncExitStack
 
 from mcp_client import MCPClient
 from core.claude import Claude
+from core.router import ModelRouter
+from core.scheduler import RequestScheduler
+from core.session_store import SessionStore
 from core.cli_chat import CliChat
 from core.cli import CliApp
 
 load_dotenv()
 
 google_model = os.getenv("GOOGLE_MODEL", "gemini-1.5-flash")
+# Optional comma-separated list, fastest first, to route between several models
+google_models = [
+    m.strip() for m in os.getenv("GOOGLE_MODELS", "").split(",") if m.strip()
+]
 google_api_key = os.getenv("GOOGLE_API_KEY", "")
+google_rpm = float(os.getenv("GOOGLE_RPM", "15"))
+google_tpm = float(os.getenv("GOOGLE_TPM", "1000000"))
+google_max_retries = int(os.getenv("GOOGLE_MAX_RETRIES", "5"))
+max_tool_rounds = int(os.getenv("CHAT_MAX_TOOL_ROUNDS", "10"))
+turn_deadline = float(os.getenv("CHAT_TURN_DEADLINE", "120"))
+tool_timeout = float(os.getenv("CHAT_TOOL_TIMEOUT", "30"))
+final_answer_timeout = float(os.getenv("CHAT_FINAL_ANSWER_TIMEOUT", "60"))
+# Reuse a SESSION_ID to resume that conversation
+session_dir = Path(
+    os.getenv("SESSION_DIR", str(Path(__file__).parent / "sessions"))
+)
+session_id = os.getenv("SESSION_ID") or time.strftime("%Y%m%d-%H%M%S")
+context_tokens = int(os.getenv("CHAT_CONTEXT_TOKENS", "100000"))
 
 assert google_api_key, "Error: GOOGLE_API_KEY cannot be empty. Update .env"
 
 async def main():
-    claude_service = Claude(model=google_model)
+    claude_service = (
+        ModelRouter(models=google_models)
+        if len(google_models) > 1
+        else Claude(model=google_models[0] if google_models else google_model)
+    )
+    scheduler = RequestScheduler(
+        requests_per_minute=google_rpm,
+        tokens_per_minute=google_tpm,
+        max_retries=google_max_retries,
+    )
 
     server_scripts = sys.argv[1:]
     clients = {}
@@ -45,9 +76,21 @@ async def main():
             doc_client=doc_client,
             clients=clients,
             claude_service=claude_service,
+            scheduler=scheduler,
+            max_tool_rounds=max_tool_rounds,
+            turn_deadline=turn_deadline,
+            tool_timeout=tool_timeout,
+            final_answer_timeout=final_answer_timeout,
+            session_id=session_id,
+            session_store=SessionStore(session_dir),
         )
+        restored = chat.resume(context_tokens)
+        if restored:
+            print(f"Resumed session {session_id} ({restored} messages)")
+        else:
+            print(f"Session {session_id}")
 
-        cli = CliApp(chat)
+        cli = CliApp(chat, history_path=str(session_dir / "prompt_history"))
         await cli.initialize()
         await cli.run()
 
@@ -1,13 +1,108 @@
 import os
+import sys
+from collections import OrderedDict
 from pathlib import Path
+from typing import Callable, Optional, TypeVar
+import anyio
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("LocalFileMCP", log_level="ERROR")
 DOCS_DIR = Path(__file__).parent / "documents"
 
+# Blocking filesystem work runs on at most this many worker threads
+IO_THREADS = int(os.getenv("MCP_IO_THREADS", "8"))
+READ_CHUNK_SIZE = 1024 * 1024
+# Upper bound on decoded document text kept in memory
+CACHE_MAX_BYTES = int(os.getenv("MCP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+BINARY_PLACEHOLDER = "[Binary file or non-text content]"
+
 if not DOCS_DIR.exists():
     DOCS_DIR.mkdir()
 
+T = TypeVar("T")
+_io_limiter: Optional[anyio.CapacityLimiter] = None
+
+async def _run_io(func: Callable[..., T], *args) -> T:
+    """Run blocking file I/O on the bounded worker pool."""
+    global _io_limiter
+    if _io_limiter is None:
+        _io_limiter = anyio.CapacityLimiter(IO_THREADS)
+    return await anyio.to_thread.run_sync(func, *args, limiter=_io_limiter)
+
+def _read_text(file_path: Path) -> str:
+    """Read a UTF-8 file in chunks, so binary files fail on the first bad chunk."""
+    chunks = []
+    with file_path.open("r", encoding="utf-8") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            chunks.append(chunk)
+    return "".join(chunks)
+
+class DocumentCache:
+    """
+    Byte-bounded LRU cache of decoded documents, keyed by (path, mtime_ns, size)
+    so a changed file is never served stale. Binary files are cached as None
+    so the failed decode is not repeated.
+    """
+
+    # Accounted size of a cached "binary" marker
+    BINARY_ENTRY_BYTES = 64
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, Optional[str]] = OrderedDict()
+        self.keys_by_path: dict[str, tuple] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cost(self, text: Optional[str]) -> int:
+        # Memory held by the decoded string, which can be up to 4x the
+        # file size for non-ASCII text
+        return self.BINARY_ENTRY_BYTES if text is None else sys.getsizeof(text)
+
+    def get(self, key: tuple) -> tuple[bool, Optional[str]]:
+        """Return (found, text); text is None for a cached binary file."""
+        if key not in self.entries:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return True, self.entries[key]
+
+    def put(self, key: tuple, text: Optional[str]):
+        # Any older version of the file is stale, even if this one won't fit
+        self.discard(key[0])
+        cost = self._cost(text)
+        if cost > self.max_bytes:
+            return
+        self.entries[key] = text
+        self.keys_by_path[key[0]] = key
+        self.current_bytes += cost
+        while self.current_bytes > self.max_bytes:
+            old_key, old_text = self.entries.popitem(last=False)
+            del self.keys_by_path[old_key[0]]
+            self.current_bytes -= self._cost(old_text)
+            self.evictions += 1
+
+    def discard(self, path: str):
+        """Drop any cached version of the file at `path`."""
+        key = self.keys_by_path.pop(path, None)
+        if key is not None:
+            self.current_bytes -= self._cost(self.entries.pop(key))
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+doc_cache = DocumentCache(CACHE_MAX_BYTES)
+
 def _get_path(doc_id: str) -> Path:
     """Helper to safely get the file path."""
     safe_path = (DOCS_DIR / doc_id).resolve()
@@ -16,53 +111,70 @@ def _get_path(doc_id: str) -> Path:
     return safe_path
 
 @mcp.tool()
-def read_doc(doc_id: str) -> str:
+async def read_doc(doc_id: str) -> str:
     """Read the contents of a real file from the documents folder."""
     file_path = _get_path(doc_id)
     
-    if not file_path.exists():
-        raise ValueError(f"Document {doc_id} not found")
-        
     try:
-        return file_path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-        return "[Binary file or non-text content]"
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
+        stat = await _run_io(file_path.stat)
+    except FileNotFoundError:
+        raise ValueError(f"Document {doc_id} not found")
+
+    key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+    found, text = doc_cache.get(key)
+    if not found:
+        try:
+            text = await _run_io(_read_text, file_path)
+        except UnicodeDecodeError:
+            text = None
+        except Exception as e:
+            return f"Error reading file: {str(e)}"
+        doc_cache.put(key, text)
+
+    return BINARY_PLACEHOLDER if text is None else text
 
 @mcp.tool()
-def edit_doc(doc_id: str, content: str) -> str:
+async def edit_doc(doc_id: str, content: str) -> str:
     """Edit (or create) a file in the documents folder."""
     file_path = _get_path(doc_id)
     
     try:
-        file_path.write_text(content, encoding="utf-8")
+        await _run_io(lambda: file_path.write_text(content, encoding="utf-8"))
+        doc_cache.discard(str(file_path))
         return f"Successfully saved {doc_id}"
     except Exception as e:
         return f"Error writing file: {str(e)}"
 
-@mcp.resource("docs://documents")
-def list_documents() -> list[str]:
-    """List all filenames in the documents folder."""
+def _list_files() -> list[str]:
     if not DOCS_DIR.exists():
         return []
     return [f.name for f in DOCS_DIR.iterdir() if f.is_file()]
 
+@mcp.resource("docs://documents")
+async def list_documents() -> list[str]:
+    """List all filenames in the documents folder."""
+    return await _run_io(_list_files)
+
 @mcp.resource("docs://documents/{doc_id}")
-def get_document_content(doc_id: str) -> str:
+async def get_document_content(doc_id: str) -> str:
     """Return the content of a specific document (for the @ mention system)."""
-    return read_doc(doc_id)
+    return await read_doc(doc_id)
+
+@mcp.resource("docs://stats")
+def cache_stats() -> dict:
+    """Hit, miss and eviction counters of the document content cache."""
+    return doc_cache.stats()
 
 @mcp.prompt()
-def summarize(doc_id: str) -> str:
+async def summarize(doc_id: str) -> str:
     """Create a prompt to summarize a specific document."""
-    content = read_doc(doc_id)
+    content = await read_doc(doc_id)
     return f"Please summarize the following document:\n\nContent:\n{content}"
 
 @mcp.prompt()
-def rewrite(doc_id: str) -> str:
+async def rewrite(doc_id: str) -> str:
     """Create a prompt to rewrite a document in markdown."""
-    content = read_doc(doc_id)
+    content = await read_doc(doc_id)
     return f"Please rewrite the following document in Markdown format:\n\nContent:\n{content}"
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+import sys
+
+from mcp_server import DocumentCache
+
+
+def _key(path, version=1):
+    return (path, version, 0)
+
+
+def test_cost_is_decoded_string_size():
+    cache = DocumentCache(max_bytes=1_000_000)
+    text = "a" * 1000 + "\N{GRINNING FACE}"
+
+    cache.put(_key("a.txt"), text)
+
+    assert cache.current_bytes == sys.getsizeof(text)
+
+
+def test_least_recently_used_entry_is_evicted():
+    text = "x" * 100
+    cache = DocumentCache(max_bytes=2 * sys.getsizeof(text))
+    cache.put(_key("a"), text)
+    cache.put(_key("b"), text)
+    cache.get(_key("a"))
+
+    cache.put(_key("c"), text)
+
+    assert cache.get(_key("b")) == (False, None)
+    assert cache.get(_key("a")) == (True, text)
+    assert cache.get(_key("c")) == (True, text)
+    assert cache.stats()["evictions"] == 1
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_new_version_replaces_old_one():
+    cache = DocumentCache(max_bytes=1_000_000)
+    cache.put(_key("a", 1), "v1")
+
+    cache.put(_key("a", 2), "v2")
+
+    assert cache.get(_key("a", 1)) == (False, None)
+    assert cache.get(_key("a", 2)) == (True, "v2")
+    assert cache.current_bytes == sys.getsizeof("v2")
+
+
+def test_oversized_new_version_drops_old_one():
+    cache = DocumentCache(max_bytes=200)
+    cache.put(_key("a", 1), "small")
+
+    cache.put(_key("a", 2), "x" * 1000)
+
+    assert cache.stats()["entries"] == 0
+    assert cache.current_bytes == 0
+
+
+def test_binary_marker_is_cached():
+    cache = DocumentCache(max_bytes=1_000)
+    cache.put(_key("b.bin"), None)
+
+    assert cache.get(_key("b.bin")) == (True, None)
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from core.router import ModelRouter
+from core.scheduler import RequestScheduler
+
+MESSAGES = [{"role": "user", "parts": ["hi"]}]
+
+
+def _router(failures: dict) -> ModelRouter:
+    """A router whose models raise the exception mapped to their name, if any."""
+    router = ModelRouter(["fast", "mid", "strong"])
+    for name, service in router.services.items():
+
+        def chat(messages, name=name, **kwargs):
+            if name in failures:
+                raise failures[name]
+            return name
+
+        service.chat = chat
+    return router
+
+
+def test_falls_back_on_retryable_error():
+    router = _router({"fast": google_exceptions.ResourceExhausted("429")})
+
+    assert router.chat(MESSAGES) == "mid"
+    assert router.stats["fast"].error_rate == 1.0
+    assert router.stats["mid"].error_rate == 0.0
+
+
+def test_client_error_is_raised_without_touching_stats():
+    router = _router({name: ValueError("bad history") for name in ("fast", "mid", "strong")})
+
+    with pytest.raises(ValueError):
+        router.chat(MESSAGES)
+    assert all(not stats.samples for stats in router.stats.values())
+
+
+def test_failed_model_is_retried_after_samples_expire():
+    router = _router({"fast": google_exceptions.ServiceUnavailable("down")})
+    router.chat(MESSAGES)
+    assert router.route(10)[0] == "mid"
+
+    router.stats["fast"].max_age = 0
+    assert router.route(10)[0] == "fast"
+
+
+def test_scheduler_admits_each_fallback_separately():
+    router = _router({"fast": google_exceptions.ResourceExhausted("429")})
+    scheduler = RequestScheduler()
+
+    assert asyncio.run(scheduler.chat(router, messages=MESSAGES)) == "mid"
+    stats = scheduler.stats()
+    assert stats["admissions"] == 2
+    assert stats["fallbacks"] == 1
+    assert stats["retries"] == 0
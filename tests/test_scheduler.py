@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from core.scheduler import RequestScheduler
+
+
+def _drained_scheduler(**kwargs) -> RequestScheduler:
+    """A scheduler whose request bucket is empty, so requests queue up."""
+    scheduler = RequestScheduler(requests_per_minute=6000, **kwargs)
+    scheduler.request_bucket.tokens = 0
+    return scheduler
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = _drained_scheduler()
+    order = []
+
+    async def main():
+        await asyncio.gather(
+            *(
+                scheduler.submit(session_id, order.append, f"{session_id}{i}")
+                for session_id in "AB"
+                for i in range(3)
+            )
+        )
+
+    asyncio.run(main())
+    assert order == ["A0", "B0", "A1", "B1", "A2", "B2"]
+
+
+def test_retryable_error_is_retried():
+    scheduler = RequestScheduler(base_delay=0.001)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise google_exceptions.ResourceExhausted("429")
+        return "ok"
+
+    assert asyncio.run(scheduler.submit("s", flaky)) == "ok"
+    assert len(calls) == 2
+    assert scheduler.stats()["retries"] == 1
+    assert scheduler.stats()["failures"] == 0
+
+
+def test_non_retryable_error_is_raised():
+    scheduler = RequestScheduler(base_delay=0.001)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.submit("s", broken))
+    assert scheduler.stats()["retries"] == 0
+    assert scheduler.stats()["failures"] == 1
+
+
+def test_cancelled_request_leaves_the_queue():
+    scheduler = _drained_scheduler()
+    calls = []
+
+    async def main():
+        first = asyncio.create_task(scheduler.submit("A", calls.append, "A"))
+        second = asyncio.create_task(scheduler.submit("B", calls.append, "B"))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 1
+        await second
+
+    asyncio.run(main())
+    assert calls == ["B"]
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_non_positive_rate_is_rejected():
+    with pytest.raises(ValueError):
+        RequestScheduler(requests_per_minute=0)
@@ -0,0 +1,127 @@
+from collections.abc import Mapping, Sequence
+
+from core.chat import Chat
+from core.session_store import SessionStore
+
+
+class FakeMapComposite(Mapping):
+    """Stands in for the proto map type used in Gemini function call args."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FakeRepeatedComposite(Sequence):
+    """Stands in for the proto repeated type used in Gemini function call args."""
+
+    def __init__(self, items):
+        self._items = items
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _tool_call(name, args):
+    return {"role": "model", "parts": [{"function_call": {"name": name, "args": args}}]}
+
+
+def test_append_serializes_nested_tool_call_args(tmp_path):
+    store = SessionStore(tmp_path)
+    args = {
+        "filters": FakeMapComposite({"tags": FakeRepeatedComposite(["a", "b"])}),
+        "ids": FakeRepeatedComposite([1, FakeMapComposite({"x": 2})]),
+    }
+
+    store.append("s", [{"role": "user", "parts": ["hi"]}, _tool_call("search", args)])
+
+    loaded = store.load_tail("s")
+    assert loaded[1]["parts"][0]["function_call"]["args"] == {
+        "filters": {"tags": ["a", "b"]},
+        "ids": [1, {"x": 2}],
+    }
+
+
+def test_load_tail_keeps_last_user_turn_over_budget(tmp_path):
+    store = SessionStore(tmp_path)
+    store.append(
+        "s",
+        [
+            {"role": "user", "parts": ["old question"]},
+            {"role": "model", "parts": [{"text": "old answer"}]},
+            {"role": "user", "parts": ["x" * 4000]},
+            {"role": "model", "parts": [{"text": "answer"}]},
+        ],
+    )
+
+    loaded = store.load_tail("s", token_budget=200)
+
+    assert [m["role"] for m in loaded] == ["user", "model"]
+    assert loaded[0]["parts"][0] == "x" * 4000
+
+
+def test_load_tail_shares_document_blobs(tmp_path):
+    store = SessionStore(tmp_path, blob_threshold=100)
+    doc = "D" * 1000
+    for i in range(3):
+        store.append(
+            "s",
+            [{"role": "user", "parts": [f'q{i}\n<document id="a">\n{doc}\n</document>\n']}],
+        )
+
+    assert len(list((tmp_path / "blobs").iterdir())) == 1
+    loaded = store.load_tail("s")
+    assert all(doc in m["parts"][0] for m in loaded)
+
+
+class FakeClaude:
+    def add_tool_output_messages(self, messages, tool_outputs):
+        messages.append({"role": "function", "parts": tool_outputs})
+
+
+def test_resume_answers_trailing_tool_call(tmp_path):
+    store = SessionStore(tmp_path)
+    store.append(
+        "s",
+        [{"role": "user", "parts": ["read it"]}, _tool_call("read_doc", {"doc_id": "a"})],
+    )
+
+    chat = Chat(FakeClaude(), {}, session_id="s", session_store=store)
+    chat.resume()
+
+    assert [m["role"] for m in chat.messages] == ["user", "model", "function"]
+    response = chat.messages[-1]["parts"][0]["function_response"]
+    assert response["name"] == "read_doc"
+    assert "session interrupted" in response["response"]["error"]
+    # The answer is written back so the log itself is repaired
+    assert [m["role"] for m in store.load_tail("s")] == ["user", "model", "function"]
+
+
+def test_append_after_torn_write_keeps_new_records(tmp_path):
+    store = SessionStore(tmp_path)
+    store.append(
+        "s",
+        [{"role": "user", "parts": ["q1"]}, {"role": "model", "parts": [{"text": "a1"}]}],
+    )
+    # Simulate a crash halfway through writing the next record
+    with (tmp_path / "s.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"tokens": 3, "message": {"role": "us')
+
+    store.append(
+        "s",
+        [{"role": "user", "parts": ["q2"]}, {"role": "model", "parts": [{"text": "a2"}]}],
+    )
+
+    loaded = store.load_tail("s")
+    assert [m["parts"][0] for m in loaded] == ["q1", {"text": "a1"}, "q2", {"text": "a2"}]